@@ -0,0 +1,57 @@
+from flask_admin import Admin
+from flask_admin.contrib.sqla import ModelView
+from db import db
+from models import User, Reservation, Disponibilita, Professional
+from wtforms import StringField
+from wtforms.validators import InputRequired
+from orario import parse_orario, format_orario
+
+# Viste dell'Admin Panel, registrate da create_app solo con ADMIN_ENABLED.
+
+class OrarioField(StringField):
+    """Campo "HH:MM" per i form dell'admin; nel modello l'orario resta in minuti dalla mezzanotte"""
+
+    def _value(self):
+        if isinstance(self.data, int):
+            return format_orario(self.data)
+        return self.raw_data[0] if self.raw_data else ''
+
+    def process_formdata(self, valuelist):
+        if valuelist:
+            try:
+                self.data = parse_orario(valuelist[0])
+            except ValueError:
+                self.data = None
+                raise ValueError('Formato orario non valido (HH:MM)')
+
+
+class UserModelView(ModelView):
+    column_list = ['id','nome','cognome','data_nascita','sesso_biologico','nazione_nascita','provincia_nascita','comune_nascita','codice_fiscale','email','cellulare','password_hash','role','consenso_trattamento_dati','created_at']
+    column_labels = { 'id': 'ID', 'nome': 'Nome','cognome':'Cognome', 'data_nascita': 'Data di nascita', 'sesso_biologico': 'Sesso Biologico','nazione_nascita': 'Nazione di Nascita','provincia_nascita': 'Provincia di Nascita', 'comune_nascita' : 'Comune di Nascita', 'codice_fiscale': 'Codice Fiscale','email':'email','cellulare':'Cellulare', 'password_hash':'password_hash', 'created_at' : 'creato il','role':'Ruolo' ,'consenso_trattamento_dati':'consenso' }
+
+class ReservationModelView(ModelView):  
+    column_list = ['id','user_id','professional_id','data','orario','stato' ]     
+    column_labels = { 'id': 'Reservation ID', 'user_id': 'Id utente','professional_id':'ID professionista','data':'Data Apt','stato': 'stato Apt' }
+    column_formatters = { 'orario': lambda v, c, m, p: format_orario(m.orario) }
+    form_overrides = { 'orario': OrarioField }
+    form_args = { 'orario': { 'validators': [InputRequired()] } }
+
+class ProfessionalModelView(ModelView):
+    column_list = ['id','nome','specializzazione','disponibilita','image_url']
+    column_labels =  { 'id': 'ID', 'nome': 'Nome', 'specializzazione' : 'specializzazione','image_url':'Image'}
+
+class DisponibilitaModelView(ModelView):
+    column_list = ['id','professional_id','data','orario']
+    column_labels = { 'id': 'ID', 'professional_id': 'professione', 'data' : 'data','orario': 'orario' }
+    column_formatters = { 'orario': lambda v, c, m, p: format_orario(m.orario) }
+    form_overrides = { 'orario': OrarioField }
+    form_args = { 'orario': { 'validators': [InputRequired()] } }
+
+
+def init_admin(app):
+    admin = Admin(app, name='Admin Panel', template_mode='bootstrap3')
+    admin.add_view(ReservationModelView(Reservation, db.session))  
+    admin.add_view(UserModelView(User, db.session)) 
+    admin.add_view(ProfessionalModelView(Professional, db.session))  
+    admin.add_view(DisponibilitaModelView(Disponibilita, db.session)) 
+    return admin
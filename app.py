@@ -1,32 +1,41 @@
 from flask import Flask, jsonify, request
 from datetime import datetime
-from flask_admin import Admin
+from sqlalchemy import tuple_
+from sqlalchemy.exc import SQLAlchemyError
 from flask_restx import Api, Resource, fields
-from models import User, Reservation, Disponibilita, Professional,DisponibilitaModelView,ProfessionalModelView,UserModelView,ReservationModelView
+from models import User, Reservation, Disponibilita, Professional
 from db import db
-from flask_cors import CORS
+from config import Config, DevConfig
 from cf import genera_codice_fiscale
+from orario import parse_orario, format_orario, FASCE_ORARIE
+from limiter import rate_limit, check_limit, troppe_richieste, client_ip, SingleFlight
 
 
-app = Flask(__name__)
-CORS(app)
+# le risorse si registrano su api; l'app viene creata da create_app
+api = Api(doc='/docs') 
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'  
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  
+single_flight = SingleFlight()
 
-api = Api(app, doc='/docs') 
 
+def create_app(config=None):
+    """Crea l'app Flask; Admin Panel e Swagger vengono registrati solo se abilitati in config"""
+    from flask_cors import CORS
 
-db.init_app(app)
+    app = Flask(__name__)
+    app.config.from_object(config or Config)
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    CORS(app)
 
+    db.init_app(app)
+    api.init_app(app, add_specs=app.config['SWAGGER_ENABLED'])
 
-admin = Admin(app, name='Admin Panel', template_mode='bootstrap3')
+    if app.config['ADMIN_ENABLED']:
+        from admin import init_admin
+        init_admin(app)
 
-
-admin.add_view(ReservationModelView(Reservation, db.session))  
-admin.add_view(UserModelView(User, db.session)) 
-admin.add_view(ProfessionalModelView(Professional, db.session))  
-admin.add_view(DisponibilitaModelView(Disponibilita, db.session)) 
+    return app
 
 #modelli 
 user_model = api.model('User', {
@@ -65,6 +74,7 @@ role_model = api.model('Role', {
 @api.route('/api/register')
 class Register(Resource):
     @api.expect(user_model)
+    @rate_limit(per_minute=5)
     def post(self):
         """Registra un nuovo utente"""
         data = request.get_json()
@@ -135,6 +145,7 @@ class Register(Resource):
 
 @api.route('/api/genera_codice_fiscale')
 class GeneraCodiceFiscale(Resource):
+    @rate_limit(per_minute=30)
     def post(self):
         """Genera il codice fiscale basato sui dati ricevuti"""
         data = request.get_json()
@@ -154,6 +165,7 @@ class GeneraCodiceFiscale(Resource):
 @api.route('/api/users')
 class Users(Resource):
     @api.doc('get_users') 
+    @db.read_only
     def get(self): 
         """Ottieni tutti gli utenti"""
         users = User.query.all()
@@ -162,6 +174,7 @@ class Users(Resource):
 @api.route('/api/users/<int:id>')
 class UserDetail(Resource):
     @api.doc('get_user')
+    @db.read_only
     def get(self, id):
         """Ottieni i dettagli di un singolo utente"""
         user = User.query.get(id)
@@ -197,6 +210,7 @@ class Login(Resource):
         'email': fields.String(required=True, description='Email dell\'utente'),
         'password': fields.String(required=True, description='Password dell\'utente')
     }))
+    @rate_limit(per_minute=10, burst=5)
     def post(self):
         """Login utente"""
         data = request.get_json()
@@ -210,7 +224,15 @@ class Login(Resource):
         if not email or not password:
             return {'message': 'Email e password sono obbligatorie'}, 400
 
-        
+        # limiti per account: si consumano solo sui tentativi falliti, così chi conosce
+        # un'email non può bloccare l'utente; il limite globale per email ferma gli attacchi distribuiti
+        account = str(email).strip().lower()
+        limiti = [(f'login:{account}:{client_ip()}', 5), (f'login:{account}', 50)]
+        for bucket, per_minute in limiti:
+            wait = check_limit(bucket, per_minute, cost=0)
+            if wait:
+                return troppe_richieste(wait)
+
         user = User.query.filter_by(email=email).first()
 
         if user and user.check_password(password):
@@ -221,15 +243,18 @@ class Login(Resource):
                 'name': user.nome  
             }, 200
         else:
+            for bucket, per_minute in limiti:
+                check_limit(bucket, per_minute)
             return {'message': 'Credenziali non valide'}, 401
 
 @api.route('/api/reservations')
 class Reservations(Resource):
     @api.doc('get_reservations')
+    @db.read_only
     def get(self):
         """Ottieni tutte le prenotazioni"""
         reservations = Reservation.query.all()
-        return [{'id': reservation.id, 'user_id': reservation.user_id, 'data': reservation.data.strftime('%Y-%m-%d'), 'orario': reservation.orario, 'stato': reservation.stato} for reservation in reservations]
+        return [{'id': reservation.id, 'user_id': reservation.user_id, 'data': reservation.data.strftime('%Y-%m-%d'), 'orario': format_orario(reservation.orario), 'stato': reservation.stato} for reservation in reservations]
 
 
 
@@ -243,9 +268,12 @@ class AddReservation(Resource):
         user_id = data.get('user_id')
         professional_id = data.get('professional_id')  
         data_visita = data.get('data')
-        orario = data.get('orario')
         stato = data.get('stato', 'in attesa')  
         formatted_date = datetime.strptime(data_visita, '%Y-%m-%d').date()
+        try:
+            orario = parse_orario(data.get('orario'))
+        except ValueError:
+            return {'message': 'Formato orario non valido (HH:MM)'}, 400
 
         
         user = User.query.get(user_id)
@@ -283,6 +311,145 @@ class AddReservation(Resource):
         return {'message': 'Prenotazione aggiunta con successo', 'id': reservation.id}, 201
 
 
+MAX_OPERAZIONI_BATCH = 500
+
+batch_model = api.model('ReservationBatch', {
+    'operazioni': fields.List(fields.Raw, required=True, description=(
+        "Lista di operazioni: {'op': 'create', 'user_id', 'professional_id', 'data', 'orario', 'stato'}, "
+        "{'op': 'update_stato', 'id', 'stato'} oppure {'op': 'delete', 'id'}")),
+    'atomico': fields.Boolean(default=False, description="Se vero, un solo errore annulla tutte le operazioni")
+})
+
+
+@api.route('/api/reservations/batch')
+class ReservationBatch(Resource):
+    @api.doc('batch_reservations')
+    @api.expect(batch_model)
+    def post(self):
+        """Crea, aggiorna lo stato o elimina più prenotazioni in un'unica transazione"""
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('operazioni'), list):
+            return {'message': "Il payload deve contenere la lista 'operazioni'"}, 400
+        operazioni = data['operazioni']
+        if len(operazioni) > MAX_OPERAZIONI_BATCH:
+            return {'message': f'Massimo {MAX_OPERAZIONI_BATCH} operazioni per richiesta'}, 400
+
+        risultati = [None] * len(operazioni)
+        valide = []
+        for i, op in enumerate(operazioni):
+            try:
+                valide.append((i, self.parse_operazione(op)))
+            except ValueError as e:
+                risultati[i] = {'indice': i, 'esito': 'errore', 'message': str(e)}
+
+        creates = [op for _, op in valide if op['op'] == 'create']
+        ids = {op['id'] for _, op in valide if op['op'] != 'create'}
+        slot_richiesti = {(op['professional_id'], op['data'], op['orario']) for op in creates}
+
+        # una query IN per ogni insieme, invece di una per operazione
+        prenotazioni = {r.id: r for r in Reservation.query.filter(Reservation.id.in_(ids))} if ids else {}
+        user_ids = {u for (u,) in db.session.query(User.id).filter(User.id.in_({op['user_id'] for op in creates}))} if creates else set()
+        professional_ids = {p for (p,) in db.session.query(Professional.id).filter(Professional.id.in_({op['professional_id'] for op in creates}))} if creates else set()
+        disponibili, occupati = set(), set()
+        if slot_richiesti:
+            slot_col = tuple_(Disponibilita.professional_id, Disponibilita.data, Disponibilita.orario)
+            disponibili = set(db.session.query(Disponibilita.professional_id, Disponibilita.data, Disponibilita.orario).filter(slot_col.in_(slot_richiesti)).all())
+            res_col = tuple_(Reservation.professional_id, Reservation.data, Reservation.orario)
+            occupati = set(db.session.query(Reservation.professional_id, Reservation.data, Reservation.orario).filter(res_col.in_(slot_richiesti)).all())
+
+        nuove = []
+        for i, op in valide:
+            esito = {'indice': i, 'op': op['op']}
+            if op['op'] == 'create':
+                slot = (op['professional_id'], op['data'], op['orario'])
+                if op['user_id'] not in user_ids:
+                    errore = f"User with ID {op['user_id']} does not exist"
+                elif op['professional_id'] not in professional_ids:
+                    errore = f"Professional with ID {op['professional_id']} does not exist"
+                elif slot not in disponibili:
+                    errore = f"Orario non disponibile per il professionista {op['professional_id']}"
+                elif slot in occupati:
+                    errore = 'Orario già prenotato'
+                else:
+                    errore = None
+                    occupati.add(slot)
+                    reservation = Reservation(user_id=op['user_id'], professional_id=op['professional_id'],
+                                              data=op['data'], orario=op['orario'], stato=op['stato'])
+                    db.session.add(reservation)
+                    nuove.append((esito, reservation))
+            else:
+                reservation = prenotazioni.get(op['id'])
+                esito['id'] = op['id']
+                if reservation is None:
+                    errore = 'Prenotazione non trovata'
+                else:
+                    errore = None
+                    if op['op'] == 'update_stato':
+                        reservation.stato = op['stato']
+                    else:
+                        del prenotazioni[op['id']]
+                        occupati.discard((reservation.professional_id, reservation.data, reservation.orario))
+                        db.session.delete(reservation)
+            esito['esito'] = 'errore' if errore else 'ok'
+            if errore:
+                esito['message'] = errore
+            risultati[i] = esito
+
+        errori = sum(1 for r in risultati if r['esito'] == 'errore')
+        if errori and data.get('atomico'):
+            db.session.rollback()
+            return {'message': 'Nessuna operazione applicata', 'errori': errori, 'risultati': risultati}, 409
+
+        try:
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            return {'message': 'Errore del database, nessuna operazione applicata'}, 500
+        for esito, reservation in nuove:
+            esito['id'] = reservation.id
+        return {'message': 'Operazioni completate', 'errori': errori, 'risultati': risultati}, 200
+
+    @staticmethod
+    def parse_operazione(op):
+        """Valida un'operazione del batch e converte data/orario; ValueError se non valida"""
+        if not isinstance(op, dict):
+            raise ValueError("Ogni operazione deve essere un oggetto JSON")
+        tipo = op.get('op')
+        if tipo == 'create':
+            if not isinstance(op.get('data'), str):
+                raise ValueError('Formato data non valido (YYYY-MM-DD)')
+            try:
+                data_visita = datetime.strptime(op['data'], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError('Formato data non valido (YYYY-MM-DD)')
+            try:
+                orario = parse_orario(op.get('orario'))
+            except ValueError:
+                raise ValueError('Formato orario non valido (HH:MM)')
+            return {'op': tipo, 'user_id': ReservationBatch.intero(op, 'user_id'),
+                    'professional_id': ReservationBatch.intero(op, 'professional_id'),
+                    'data': data_visita, 'orario': orario, 'stato': ReservationBatch.stato(op, 'in attesa')}
+        if tipo in ('update_stato', 'delete'):
+            stato = ReservationBatch.stato(op) if tipo == 'update_stato' else None
+            return {'op': tipo, 'id': ReservationBatch.intero(op, 'id'), 'stato': stato}
+        raise ValueError("'op' deve essere create, update_stato o delete")
+
+    @staticmethod
+    def intero(op, campo):
+        valore = op.get(campo)
+        # bool è una sottoclasse di int: true non deve diventare l'id 1
+        if not isinstance(valore, int) or isinstance(valore, bool) or not 0 < valore < 2 ** 63:
+            raise ValueError(f'{campo} deve essere un intero positivo')
+        return valore
+
+    @staticmethod
+    def stato(op, default=None):
+        stato = op.get('stato', default)
+        if not isinstance(stato, str) or not stato.strip() or len(stato) > 20:
+            raise ValueError("stato deve essere un testo non vuoto (massimo 20 caratteri)")
+        return stato
+
+
 
 @api.route('/api/disponibilita/<int:id>')
 class DisponibilitaResource(Resource):
@@ -305,6 +472,7 @@ class DisponibilitaResource(Resource):
 @api.route('/api/professionals')
 class Professionals(Resource):
     @api.doc('get_professionals')
+    @db.read_only
     def get(self):
         """Ottieni tutti i professionisti"""
         professionals = Professional.query.all()
@@ -337,6 +505,7 @@ class Professionals(Resource):
 @api.route('/api/reservations/<int:id>')
 class ReservationDetail(Resource):
     @api.doc('get_reservation')
+    @db.read_only
     def get(self, id):
         """Ottieni i dettagli di una prenotazione"""
         reservation = Reservation.query.get(id)
@@ -348,7 +517,7 @@ class ReservationDetail(Resource):
             'id': reservation.id,
             'user_id': reservation.user_id,
             'data': reservation.data.strftime('%Y-%m-%d'),
-            'orario': reservation.orario,
+            'orario': format_orario(reservation.orario),
             'stato': reservation.stato
         }
     
@@ -377,21 +546,25 @@ class ReservationDetail(Resource):
     
 @api.route('/api/professionals/<int:professional_id>/disponibilita', methods=['GET', 'POST'])
 class DisponibilitaProfessional(Resource):
+    @db.read_only
     def get(self, professional_id):
         """Restituisce tutte le date disponibili future per un professionista"""
         
         today = datetime.today().date() 
 
-        disponibilita = (
-            db.session.query(Disponibilita.data)
-            .filter(Disponibilita.professional_id == professional_id)
-            .filter(Disponibilita.data >= today)
-            .distinct()
-            .all()
-        )
+        @db.read_only
+        def query_date():
+            disponibilita = (
+                db.session.query(Disponibilita.data)
+                .filter(Disponibilita.professional_id == professional_id)
+                .filter(Disponibilita.data >= today)
+                .distinct()
+                .all()
+            )
+            return [d[0].strftime('%Y-%m-%d') for d in disponibilita]
 
-        
-        available_dates = [d[0].strftime('%Y-%m-%d') for d in disponibilita]
+        # le richieste concorrenti per lo stesso professionista condividono una sola query
+        available_dates = single_flight.do(('disponibilita', professional_id, today), query_date)
 
         return jsonify({"available_dates": available_dates})
 
@@ -419,6 +592,11 @@ class DisponibilitaProfessional(Resource):
         except ValueError:
             return {"message": "Formato data non valido (YYYY-MM-DD)"}, 400
 
+        try:
+            orario = parse_orario(orario)
+        except ValueError:
+            return {"message": "Formato orario non valido (HH:MM)"}, 400
+
         existing = Disponibilita.query.filter_by(professional_id=professional_id, data=formatted_date, orario=orario).first()
         if existing:
             return {"message": "Disponibilità già esistente per questa data e orario"}, 400
@@ -433,7 +611,7 @@ class DisponibilitaProfessional(Resource):
                 "id": nuova_disponibilita.id,
                 "professional_id": nuova_disponibilita.professional_id,
                 "data": nuova_disponibilita.data.strftime('%Y-%m-%d'),
-                "orario": nuova_disponibilita.orario
+                "orario": format_orario(nuova_disponibilita.orario)
             }
         }, 201
     
@@ -450,7 +628,11 @@ class DisponibilitaProfessional(Resource):
         
         reservation.user_id = data.get('user_id', reservation.user_id)
         reservation.data = datetime.strptime(data.get('data', reservation.data.strftime('%Y-%m-%d')), '%Y-%m-%d').date()
-        reservation.orario = data.get('orario', reservation.orario)
+        if 'orario' in data:
+            try:
+                reservation.orario = parse_orario(data['orario'])
+            except ValueError:
+                return {'message': 'Formato orario non valido (HH:MM)'}, 400
         reservation.stato = data.get('stato', reservation.stato)
         
         db.session.commit()
@@ -470,6 +652,7 @@ class DisponibilitaProfessional(Resource):
 
 @api.route('/api/reservations/user/<int:user_id>')
 class UserReservations(Resource):
+    @db.read_only
     def get(self, user_id):
         """Recupera tutti gli appuntamenti di un utente specifico"""
         reservations = Reservation.query.filter_by(user_id=user_id).all()
@@ -483,7 +666,7 @@ class UserReservations(Resource):
             results.append({
                 "id": res.id,
                 "data": res.data.strftime('%Y-%m-%d'),
-                "orario": res.orario,
+                "orario": format_orario(res.orario),
                 "stato": res.stato,
                 "professional_name": professional.nome if professional else "Non disponibile"
             })
@@ -492,8 +675,12 @@ class UserReservations(Resource):
 
 @api.route('/api/professionals/<int:professional_id>/orari', methods=['POST'])
 class OrariProfessional(Resource):
+    @db.read_only
     def post(self, professional_id):
-        """Restituisce tutti gli orari disponibili per un professionista in una data specifica"""
+        """Restituisce tutti gli orari disponibili per un professionista in una data specifica.
+
+        Filtri opzionali: 'fascia' (mattina/pomeriggio) oppure 'dalle'/'alle' (HH:MM, 'alle' escluso).
+        """
 
         
         data = request.get_json()
@@ -506,16 +693,31 @@ class OrariProfessional(Resource):
         except ValueError:
             return {"message": "Formato data non valido (YYYY-MM-DD)"}, 400  
 
-        
-        disponibilita = (
+        fascia = data.get('fascia')
+        if fascia is not None and fascia not in FASCE_ORARIE:
+            return {"message": f"Fascia non valida, valori ammessi: {', '.join(FASCE_ORARIE)}"}, 400
+        dalle, alle = FASCE_ORARIE.get(fascia, (None, None))
+        try:
+            if data.get('dalle'):
+                dalle = parse_orario(data['dalle'])
+            if data.get('alle'):
+                alle = parse_orario(data['alle'])
+        except ValueError:
+            return {"message": "Formato orario non valido (HH:MM)"}, 400
+
+        query = (
             db.session.query(Disponibilita.orario)
             .filter(Disponibilita.professional_id == professional_id)
             .filter(Disponibilita.data == data_selezionata)
-            .all()
         )
+        if dalle is not None:
+            query = query.filter(Disponibilita.orario >= dalle)
+        if alle is not None:
+            query = query.filter(Disponibilita.orario < alle)
+        disponibilita = query.order_by(Disponibilita.orario).all()
 
         
-        available_times = [d[0] for d in disponibilita]
+        available_times = [format_orario(d[0]) for d in disponibilita]
 
         return jsonify({"available_times": available_times})
 
@@ -561,4 +763,4 @@ class UpdateUser(Resource):
 
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app(DevConfig).run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+import re
+import subprocess
+import sys
+
+# Benchmark del cold start con python -X importtime: esce con codice 1 se un budget viene superato.
+# Uso: python bench_startup.py  (budget in ms sovrascrivibili, es. BUDGET_APP_MS=800)
+
+SCENARI = [
+    # nome, codice eseguito in un interprete nuovo, budget di default in ms
+    ('models', 'import models', int(os.environ.get('BUDGET_MODELS_MS', 500))),
+    ('app', 'from app import create_app; create_app()', int(os.environ.get('BUDGET_APP_MS', 600))),
+]
+RIPETIZIONI = 3
+
+RIGA = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+def misura(codice):
+    """Tempo di import totale (ms) e moduli con il tempo proprio più alto"""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codice],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    ).stderr
+    totale, moduli = 0, []
+    for m in RIGA.finditer(out):
+        proprio, cumulativo, indent, nome = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        if not indent:
+            totale += cumulativo
+        moduli.append((proprio, nome))
+    return totale / 1000, sorted(moduli, reverse=True)[:5]
+
+def main():
+    superati = []
+    for nome, codice, budget in SCENARI:
+        # il minimo di più esecuzioni riduce il rumore della macchina
+        totale, moduli = min((misura(codice) for _ in range(RIPETIZIONI)), key=lambda r: r[0])
+        esito = 'OK' if totale <= budget else 'SUPERATO'
+        print(f'{nome}: {totale:.0f} ms (budget {budget} ms) {esito}')
+        for us, modulo in moduli:
+            print(f'    {us / 1000:7.1f} ms  {modulo}')
+        if totale > budget:
+            superati.append(nome)
+    return 1 if superati else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
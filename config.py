@@ -0,0 +1,30 @@
+import os
+
+# Configurazione dell'applicazione; i valori si possono sovrascrivere con variabili d'ambiente.
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # letture su repliche, round-robin (es. 'sqlite:///replica.db,sqlite:///replica2.db')
+    SQLALCHEMY_REPLICA_URIS = [u for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u]
+    # dopo una scrittura il client legge dal primario per questi secondi (ritardo massimo delle repliche)
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+    RATE_LIMIT_ENABLED = _flag('RATE_LIMIT_ENABLED', 'true')
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL')  # backend condiviso tra i worker
+    # numero di proxy fidati davanti all'app (es. 1 dietro il load balancer): abilita ProxyFix,
+    # così rate limit e log usano l'IP del client preso da X-Forwarded-For e non quello del proxy
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # Admin Panel (/admin) e Swagger (/docs) sono disattivati di default sui worker
+    ADMIN_ENABLED = _flag('ADMIN_ENABLED', 'false')
+    SWAGGER_ENABLED = _flag('SWAGGER_ENABLED', 'false')
+
+
+class DevConfig(Config):
+    ADMIN_ENABLED = _flag('ADMIN_ENABLED', 'true')
+    SWAGGER_ENABLED = _flag('SWAGGER_ENABLED', 'true')
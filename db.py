@@ -1,3 +1,152 @@
+import itertools
+import os
+import threading
+import time
+from functools import wraps
+from flask import Flask, current_app, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from config import Config
 
-db = SQLAlchemy()
+# Routing letture/scritture: i metodi marcati con db.read_only leggono da una replica
+# (round-robin, con ripiego sul primario), tutto il resto usa il primario.
+# Se una lettura fallisce sulla replica, la replica viene esclusa per REPLICA_RETRY_SECONDS
+# e il metodo viene rieseguito sul primario.
+# Read-your-writes: dopo un commit la risposta porta il cookie/header ultima_scrittura e,
+# per REPLICA_STICKY_SECONDS, le letture di quel client vanno sul primario.
+# Le repliche si configurano con SQLALCHEMY_REPLICA_URIS (vedi config.py).
+
+REPLICA_RETRY_SECONDS = 30
+WRITE_MARKER = 'ultima_scrittura'
+WRITE_MARKER_HEADER = 'X-Ultima-Scrittura'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # read-your-writes: dopo un flush la sessione resta sul primario
+        if bind is None and self.info.get('read_only') and not self.info.get('wrote') and not self._flushing:
+            # una sola replica per ogni chiamata read_only, scelta alla prima query
+            if 'replica' not in self.info:
+                self.info['replica'] = self._db.pick_replica()
+            if self.info['replica'] is not None:
+                return self._db.engines[self.info['replica']]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('session_options', {}).setdefault('class_', RoutingSession)
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._replicas = {}  # app -> (bind key delle repliche, loro itertools.cycle)
+        self._replica_down = {}  # bind key -> istante del prossimo tentativo
+        event.listen(RoutingSession, 'after_flush', self._mark_wrote)
+        event.listen(RoutingSession, 'after_commit', self._mark_committed)
+
+    def init_app(self, app):
+        uris = app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        keys = []
+        for i, uri in enumerate(uris):
+            key = f'replica_{i}'
+            binds[key] = uri
+            keys.append(key)
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 10)
+        super().init_app(app)
+        if keys:
+            app.after_request(self._set_write_marker)
+        engines = self._app_engines[app]
+        for key in list(keys):
+            url = engines[key].url
+            # SQLite creerebbe un file vuoto al primo connect: una replica mancante va esclusa subito
+            if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+                    and not os.path.exists(url.database):
+                app.logger.warning('Replica %s non trovata, le letture useranno il primario', url.database)
+                keys.remove(key)
+        self._replicas[app] = (keys, itertools.cycle(keys))
+
+    @staticmethod
+    def _mark_wrote(session, flush_context):
+        session.info['wrote'] = True
+
+    @staticmethod
+    def _mark_committed(session):
+        if session.info.get('wrote'):
+            session.info['committed'] = True
+
+    def _set_write_marker(self, response):
+        if self.session.registry.has() and self.session().info.get('committed'):
+            marker = f'{time.time():.3f}'
+            response.set_cookie(WRITE_MARKER, marker, max_age=current_app.config['REPLICA_STICKY_SECONDS'],
+                                httponly=True, samesite='Lax')
+            response.headers[WRITE_MARKER_HEADER] = marker
+        return response
+
+    def recent_write(self):
+        """True se il client ha scritto da meno di REPLICA_STICKY_SECONDS (cookie o header rimandato)"""
+        if not has_request_context():
+            return False
+        marker = request.headers.get(WRITE_MARKER_HEADER) or request.cookies.get(WRITE_MARKER)
+        try:
+            return time.time() - float(marker) < current_app.config['REPLICA_STICKY_SECONDS']
+        except (TypeError, ValueError):
+            return False
+
+    def pick_replica(self):
+        """Bind key della prossima replica disponibile in round-robin, None se bisogna usare il primario"""
+        app = current_app._get_current_object()
+        keys, cycle = self._replicas.get(app, ((), None))
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(keys)):
+                key = next(cycle)
+                if self._replica_down.get(key, 0) <= now:
+                    return key
+        return None
+
+    def mark_replica_down(self, key):
+        with self._lock:
+            self._replica_down[key] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def read_only(self, f):
+        """Decoratore per i metodi delle Resource (o funzioni) che eseguono solo letture.
+
+        Se la replica fallisce la funzione viene rieseguita sul primario: le funzioni passate
+        a SingleFlight vanno decorate anch'esse, così i follower ricevono il risultato e non l'errore.
+        """
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if self.recent_write():
+                return f(*args, **kwargs)
+            info = self.session().info
+            previous = info.get('read_only', False)
+            info['read_only'] = True
+            info.pop('replica', None)
+            try:
+                return f(*args, **kwargs)
+            except DBAPIError as e:
+                replica = info.pop('replica', None)
+                if replica is None:
+                    raise
+                current_app.logger.warning('Lettura fallita sulla replica %s (%s), riprovo sul primario', replica, e.orig)
+                self.mark_replica_down(replica)
+                self.session.rollback()
+                info['read_only'] = False
+                return f(*args, **kwargs)
+            finally:
+                info['read_only'] = previous
+                info.pop('replica', None)
+        return wrapper
+
+
+db = RoutingSQLAlchemy()
+
+
+def create_db_app(config=None):
+    """App Flask minima con il solo database, per script e job CLI (niente API, admin o CORS)"""
+    app = Flask(__name__)
+    app.config.from_object(config or Config)
+    db.init_app(app)
+    return app
@@ -1,6 +1,7 @@
-from app import db, app
+from db import db, create_db_app
+import models  # registra le tabelle
 
-with app.app_context():
+with create_db_app().app_context():
     db.create_all()
     print("Database creato con successo!")
 
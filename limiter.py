@@ -0,0 +1,149 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, request
+
+# Rate limiting a token bucket e coalescenza delle richieste identiche (single-flight).
+
+class MemoryBackend:
+    """Token bucket in memoria, valido solo per il singolo processo"""
+
+    SWEEP_SECONDS = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # chiave -> (token, ultimo aggiornamento, istante in cui torna pieno)
+        self._next_sweep = 0
+
+    def consume(self, key, rate, capacity, now=None, cost=1):
+        """Consuma cost token; restituisce 0 se concesso, altrimenti i secondi da attendere.
+
+        Con cost=0 controlla soltanto il bucket senza consumarlo.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            tokens, last, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            return wait
+
+    def _sweep(self, now):
+        # un bucket tornato pieno equivale a uno nuovo: si può dimenticare
+        self._buckets = {k: b for k, b in self._buckets.items() if b[2] > now}
+        self._next_sweep = now + self.SWEEP_SECONDS
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RedisBackend:
+    """Token bucket condiviso tra i worker tramite Redis (richiede il pacchetto redis)"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+    local tokens = tonumber(bucket[1]) or capacity
+    local last = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - cost else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'last', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._prefix = prefix
+
+    def consume(self, key, rate, capacity, now=None, cost=1):
+        now = time.time() if now is None else now
+        return float(self._script(keys=[self._prefix + key], args=[capacity, rate, now, cost]))
+
+
+def client_ip():
+    # dietro un proxy/load balancer remote_addr è l'IP del proxy: vedi PROXY_FIX_X_FOR in config.py
+    return request.remote_addr or 'anonimo'
+
+def check_limit(bucket, per_minute, burst=None, cost=1):
+    """Controllo manuale di un bucket (cost=0 per non consumarlo); 0 se concesso, altrimenti secondi da attendere"""
+    if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+        return 0
+    return get_backend(current_app).consume(bucket, per_minute / 60.0, burst or per_minute, cost=cost)
+
+def troppe_richieste(wait):
+    return {'message': 'Troppe richieste, riprova più tardi'}, 429, {'Retry-After': str(int(wait) + 1)}
+
+def get_backend(app):
+    """Backend configurato con RATE_LIMIT_BACKEND (istanza) o RATE_LIMIT_REDIS_URL"""
+    backend = app.extensions.get('rate_limit')
+    if backend is None:
+        backend = app.config.get('RATE_LIMIT_BACKEND')
+        if backend is None and app.config.get('RATE_LIMIT_REDIS_URL'):
+            backend = RedisBackend(app.config['RATE_LIMIT_REDIS_URL'])
+        app.extensions['rate_limit'] = backend = backend or MemoryBackend()
+    return backend
+
+def rate_limit(per_minute, burst=None, key=client_ip):
+    """Limita un metodo di una Resource a per_minute richieste per chiave (IP di default).
+
+    Se key() restituisce None la richiesta non viene limitata da questo decoratore.
+    """
+    rate = per_minute / 60.0
+    capacity = burst or per_minute
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+                return f(*args, **kwargs)
+            valore = key()
+            if valore is None:
+                return f(*args, **kwargs)
+            bucket = f'{f.__qualname__}:{key.__name__}:{valore}'
+            wait = get_backend(current_app).consume(bucket, rate, capacity)
+            if wait:
+                return troppe_richieste(wait)
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SingleFlight:
+    """Esegue una sola volta le chiamate concorrenti con la stessa chiave e condivide il risultato"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # chiave -> [evento, risultato, eccezione]
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1]
@@ -0,0 +1,89 @@
+import sys
+from sqlalchemy import MetaData, inspect, text
+from db import db, create_db_app
+from models import Reservation, Disponibilita
+from orario import parse_orario, format_orario
+
+# Converte la colonna orario da stringa "HH:MM" a minuti dalla mezzanotte.
+# Gli slot duplicati di disponibilita ("9:00" e "09:00") vengono fusi tenendo l'id più basso;
+# le prenotazioni che finiscono sullo stesso slot vengono mantenute ma segnalate.
+# Tutte le righe vengono validate prima di toccare lo schema: se un orario non è valido
+# la migrazione si ferma senza modifiche.
+
+TABELLE = [Disponibilita.__table__, Reservation.__table__]
+
+def da_migrare(conn, tabella):
+    if not inspect(conn).has_table(tabella.name):
+        return False
+    colonne = {c['name']: c['type'] for c in inspect(conn).get_columns(tabella.name)}
+    return colonne['orario'].python_type is not int
+
+def prepara_righe(conn, tabella, errori):
+    """Legge e converte le righe di una tabella non migrata; gli orari non validi finiscono in errori"""
+    corrente = tabella.to_metadata(MetaData())
+    corrente.c.orario.type = db.String(10)
+
+    righe = conn.execute(corrente.select().order_by(corrente.c.id)).mappings().all()
+    nuove, visti = [], {}
+    for riga in righe:
+        riga = dict(riga)
+        try:
+            riga['orario'] = parse_orario(riga['orario'])
+        except ValueError:
+            errori.append(f"{tabella.name} id={riga['id']}: orario non valido {riga['orario']!r}")
+            continue
+        chiave = (riga['professional_id'], riga['data'], riga['orario'])
+        if chiave in visti:
+            if tabella is Disponibilita.__table__:
+                continue
+            print(f"ATTENZIONE: prenotazioni {visti[chiave]} e {riga['id']} sullo stesso slot "
+                  f"(professionista {chiave[0]}, {chiave[1]}, orario {format_orario(riga['orario'])})")
+        else:
+            visti[chiave] = riga['id']
+        nuove.append(riga)
+    return righe, nuove
+
+def migra_tabella(conn, tabella, righe, nuove):
+    # la nuova tabella viene creata con un nome temporaneo e rinominata solo alla fine
+    metadata = MetaData()
+    for altra in db.metadata.sorted_tables:  # servono per risolvere le foreign key
+        if altra is not tabella:
+            altra.to_metadata(metadata)
+    temporanea = tabella.to_metadata(metadata, name=f'{tabella.name}_new')
+    for indice in list(temporanea.indexes):
+        temporanea.indexes.discard(indice)
+    temporanea.create(conn)
+    if nuove:
+        conn.execute(temporanea.insert(), nuove)
+    conn.execute(text(f'DROP TABLE {tabella.name}'))
+    conn.execute(text(f'ALTER TABLE {temporanea.name} RENAME TO {tabella.name}'))
+    for indice in tabella.indexes:
+        indice.create(conn)
+    print(f'{tabella.name}: {len(nuove)} righe migrate ({len(righe) - len(nuove)} duplicati rimossi)')
+
+with create_db_app().app_context():
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'sqlite':
+            # pysqlite non apre la transazione prima del DDL: la apriamo noi esplicitamente
+            conn.connection.driver_connection.isolation_level = None
+            conn.exec_driver_sql('BEGIN')
+        try:
+            errori, da_fare = [], []
+            for tabella in TABELLE:
+                if da_migrare(conn, tabella):
+                    da_fare.append((tabella, *prepara_righe(conn, tabella, errori)))
+                else:
+                    print(f'{tabella.name}: niente da migrare')
+            if errori:
+                conn.rollback()
+                print('Migrazione annullata, correggi questi orari e riprova:')
+                for errore in errori:
+                    print(f'  {errore}')
+                sys.exit(1)
+            for tabella, righe, nuove in da_fare:
+                migra_tabella(conn, tabella, righe, nuove)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    print("Migrazione orari completata!")
@@ -1,7 +1,7 @@
 from db import db
 from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_admin.contrib.sqla import ModelView
+from orario import format_orario
 
 #db modelli
 class User(db.Model):
@@ -39,14 +39,18 @@ class Reservation(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     professional_id = db.Column(db.Integer, db.ForeignKey('professional.id'), nullable=False)
     data = db.Column(db.Date, nullable=False)
-    orario = db.Column(db.String(10), nullable=False)
+    orario = db.Column(db.Integer, nullable=False)  # minuti dalla mezzanotte
     stato = db.Column(db.String(20), nullable=False, default="in attesa")
     
     user = db.relationship('User', back_populates='reservations')
     professional = db.relationship('Professional', backref='reservations')
 
+    __table_args__ = (
+        db.Index('ix_reservation_slot', 'professional_id', 'data', 'orario'),
+    )
+
     def __repr__(self):
-        return f"Reservation('{self.id}','{self.user_id}', '{self.data}', '{self.orario}', '{self.stato}')"
+        return f"Reservation('{self.id}','{self.user_id}', '{self.data}', '{format_orario(self.orario)}', '{self.stato}')"
 
 
 # Modello Professional
@@ -66,23 +70,12 @@ class Disponibilita(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     professional_id = db.Column(db.Integer, db.ForeignKey('professional.id'), nullable=False)  # Relazione con Professional
     data = db.Column(db.Date, nullable=False)
-    orario = db.Column(db.String(10), nullable=False) 
-    
-    def __repr__(self):
-        return f"Disponibilita('{self.id}', '{self.professional_id}', '{self.data}', '{self.orario}')"
+    orario = db.Column(db.Integer, nullable=False)  # minuti dalla mezzanotte
 
-class UserModelView(ModelView):
-    column_list = ['id','nome','cognome','data_nascita','sesso_biologico','nazione_nascita','provincia_nascita','comune_nascita','codice_fiscale','email','cellulare','password_hash','role','consenso_trattamento_dati','created_at']
-    column_labels = { 'id': 'ID', 'nome': 'Nome','cognome':'Cognome', 'data_nascita': 'Data di nascita', 'sesso_biologico': 'Sesso Biologico','nazione_nascita': 'Nazione di Nascita','provincia_nascita': 'Provincia di Nascita', 'comune_nascita' : 'Comune di Nascita', 'codice_fiscale': 'Codice Fiscale','email':'email','cellulare':'Cellulare', 'password_hash':'password_hash', 'created_at' : 'creato il','role':'Ruolo' ,'consenso_trattamento_dati':'consenso' }
+    # l'indice del vincolo copre anche le query per fascia oraria
+    __table_args__ = (
+        db.UniqueConstraint('professional_id', 'data', 'orario', name='uq_disponibilita_slot'),
+    )
 
-class ReservationModelView(ModelView):  
-    column_list = ['id','user_id','professional_id','data','orario','stato' ]     
-    column_labels = { 'id': 'Reservation ID', 'user_id': 'Id utente','professional_id':'ID professionista','data':'Data Apt','stato': 'stato Apt' }
-
-class ProfessionalModelView(ModelView):
-    column_list = ['id','nome','specializzazione','disponibilita','image_url']
-    column_labels =  { 'id': 'ID', 'nome': 'Nome', 'specializzazione' : 'specializzazione','image_url':'Image'}
-
-class DisponibilitaModelView(ModelView):
-    column_list = ['id','professional_id','data','orario']
-    column_labels = { 'id': 'ID', 'professional_id': 'professione', 'data' : 'data','orario': 'orario' }
+    def __repr__(self):
+        return f"Disponibilita('{self.id}', '{self.professional_id}', '{self.data}', '{format_orario(self.orario)}')"
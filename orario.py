@@ -0,0 +1,23 @@
+# Gli orari degli slot sono salvati come minuti dalla mezzanotte (int).
+# Il formato "HH:MM" esiste solo ai confini dell'API.
+
+FASCE_ORARIE = {
+    'mattina': (0, 13 * 60),
+    'pomeriggio': (13 * 60, 24 * 60),
+}
+
+def parse_orario(orario):
+    """Converte "H:MM"/"HH:MM" in minuti dalla mezzanotte, ValueError se non valido"""
+    if not isinstance(orario, str):
+        raise ValueError(f'Orario non valido: {orario!r}')
+    ore, sep, minuti = orario.strip().partition(':')
+    if not sep or not ore.isdigit() or not minuti.isdigit() or len(minuti) != 2:
+        raise ValueError(f'Orario non valido: {orario!r}')
+    ore, minuti = int(ore), int(minuti)
+    if not (0 <= ore < 24 and 0 <= minuti < 60):
+        raise ValueError(f'Orario non valido: {orario!r}')
+    return ore * 60 + minuti
+
+def format_orario(minuti):
+    """Converte i minuti dalla mezzanotte in "HH:MM" """
+    return f'{minuti // 60:02d}:{minuti % 60:02d}'